@@ -9,6 +9,7 @@ import numpy as np
 import whisper
 import json
 from pathlib import Path
+import metrics
 
 # Global variables
 recording = False
@@ -80,10 +81,19 @@ if "mic_index" not in config:
     config["mic_index"] = None
 if "stereo_mix_index" not in config:
     config["stereo_mix_index"] = None
+if "metrics_enabled" not in config:
+    config["metrics_enabled"] = True
+if "profile_enabled" not in config:
+    config["profile_enabled"] = False
 save_config(config)
 
 save_folder = config["default_folder"]
 
+# Metrics get written next to the recordings. Profiling is opt in from the config file
+metrics.profile_enabled = config["profile_enabled"]
+if config["metrics_enabled"]:
+    metrics.start_exporter(save_folder)
+
 # Helper functions
 
 # Audio Callback Function
@@ -93,24 +103,36 @@ def audio_callback(indata, frames, time, status, buffer):
     buffer.append(indata.copy())
 
 # Audio Recording function
-def record_audio(device_index, buffer):
+def record_audio(device_index, buffer, input_name="Input"):
+    chunk_size = 1024 # Chunksize 1024 works for post transcribing, not so much for real time
+    metrics.event("recording_started", input=input_name, device=device_index)
     try:
         with sd.InputStream(samplerate=samplerate, channels=1, device=device_index, dtype="float32") as stream:
             while not stop_event.is_set():
                 if not paused:
-                    data, _ = stream.read(1024) # Chunksize 1024 works for post transcribing, not so much for real time
+                    data, overflowed = stream.read(chunk_size)
                     buffer.append(data)
+
+                    # Track what we've captured and whether the device dropped anything
+                    metrics.inc("transcriber_audio_chunks_total", input=input_name)
+                    metrics.inc("transcriber_audio_frames_total", len(data), input=input_name)
+                    if overflowed:
+                        metrics.inc("transcriber_audio_overflows_total", input=input_name)
+                    metrics.set_gauge("transcriber_buffer_chunks", len(buffer), input=input_name)
+                    metrics.set_gauge("transcriber_buffer_seconds", round(len(buffer) * chunk_size / samplerate, 2), input=input_name)
     except Exception as e:
         print(f"Error recording audio from device: {e}")
+        metrics.event("recording_error", input=input_name, error=str(e))
 
 # Saving the audio from the buffer to the file
 def save_audio(buffer, filename):
     if buffer:
-        with wave.open(filename, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(samplerate)
-            wf.writeframes((np.concatenate(buffer) * 32767).astype(np.int16).tobytes())
+        with metrics.timed("transcriber_save_seconds", "audio_saved"):
+            with wave.open(filename, "wb") as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(samplerate)
+                wf.writeframes((np.concatenate(buffer) * 32767).astype(np.int16).tobytes())
         print(f"Audio saved to {filename}")
 
 
@@ -119,7 +141,11 @@ def transcribe_audio(file, input_name, output_file):
     try:
         print(f"Transcribing {file} from {input_name}...")
         start_time = time.time()  # Start timing transcription. Useful for observing the ratio between recorded time and transcription time
-        result = model.transcribe(file, fp16=False)
+        metrics.inc("transcriber_transcriptions_total", input=input_name)
+        inference_start = time.perf_counter()  # monotonic, so clock changes can't skew the latency metrics
+        with metrics.profiled("transcribe"):
+            result = model.transcribe(file, fp16=False)
+        inference_time = time.perf_counter() - inference_start
 
         with open(output_file, "w", encoding="utf-8") as f:
             for segment in result["segments"]:
@@ -132,12 +158,23 @@ def transcribe_audio(file, input_name, output_file):
             f.write(f"\nTranscription completed in {transcription_time:.2f} seconds.\n")
 
         print(f"Transcription for {input_name} saved to {output_file}.")
+
+        # Metrics go last and are guarded on their own, so they can never cost us the transcript
+        try:
+            with wave.open(file, "rb") as wf:
+                audio_duration = wf.getnframes() / wf.getframerate()
+            metrics.record_transcription(input_name, inference_time, audio_duration, len(result["segments"]))
+        except Exception as e:
+            print(f"Error recording metrics for {input_name}: {e}")
     except Exception as e:
         print(f"Error during transcription for {input_name}: {e}")
+        metrics.inc("transcriber_transcription_errors_total", input=input_name)
+        metrics.event("transcription_error", input=input_name, error=str(e))
 
 
 # Combine our transcriptions based on the turbo transcription script
 def combine_transcriptions(input1_file, input2_file, combined_file):
+    merge_start = time.perf_counter()
     try:
         input1_lines = []
         input2_lines = []
@@ -176,6 +213,8 @@ def combine_transcriptions(input1_file, input2_file, combined_file):
             for entry in combined_lines:
                 f.write(f"{entry['source']}: {entry['line']}\n")
 
+        metrics.observe("transcriber_merge_seconds", time.perf_counter() - merge_start)
+        metrics.inc("transcriber_merged_lines_total", len(combined_lines))
         print(f"Combined transcription saved to {combined_file}.")
     except Exception as e:
         print(f"Error combining transcriptions: {e}")
@@ -221,8 +260,8 @@ def start_recording(timer_label, input_1, input_2):
         # Start the recording threads
         mic_buffer = []
         stereo_mix_buffer = []
-        threading.Thread(target=record_audio, args=(mic_index, mic_buffer), daemon=True).start()
-        threading.Thread(target=record_audio, args=(stereo_mix_index, stereo_mix_buffer), daemon=True).start()
+        threading.Thread(target=record_audio, args=(mic_index, mic_buffer, "Input 1"), daemon=True).start()
+        threading.Thread(target=record_audio, args=(stereo_mix_index, stereo_mix_buffer, "Input 2"), daemon=True).start()
 
         # Start the timer thread
         threading.Thread(target=update_timer, args=(timer_label,), daemon=True).start()
@@ -271,6 +310,9 @@ def stop_recording():
     transcribe_audio(input2_file, "Input 2", input2_transcription_file)
     combine_transcriptions(input1_transcription_file, input2_transcription_file, combined_file)
 
+    metrics.event("session_completed")
+    metrics.flush()
+
     messagebox.showinfo("Success", "Recording and transcription completed.")
 
 # Browse folder button, so we can save to a custom location
@@ -282,6 +324,8 @@ def browse_folder(folder_label):
         folder_label.config(text=save_folder)
         config["default_folder"] = save_folder
         save_config(config)
+        if config["metrics_enabled"]:
+            metrics.start_exporter(save_folder)
         print(f"Save folder set to: {save_folder}")
 
 
@@ -5,6 +5,7 @@ import queue
 import threading
 import time
 import wave
+import metrics
 
 # Set mic device index
 device_index = 2
@@ -27,7 +28,12 @@ stop_event = threading.Event()
 def audio_callback(indata, frames, time, status):
     if status:
         print(f"Audio status: {status}")
+        metrics.inc("transcriber_audio_status_total", input="Mic")
+        if status.input_overflow:
+            metrics.inc("transcriber_audio_overflows_total", input="Mic")
     audio_queue.put(indata.copy())
+    metrics.inc("transcriber_audio_chunks_total", input="Mic")
+    metrics.inc("transcriber_audio_frames_total", frames, input="Mic")
 
 
 def record_audio():
@@ -66,10 +72,15 @@ def transcribe_audio():
                     audio_data = rolling_buffer.flatten() / np.max(np.abs(rolling_buffer.flatten()))
                 else:
                     print("Skipping transcription due to silence.")
+                    metrics.inc("transcriber_skipped_silence_total", input="Mic")
                     continue
 
                 # Perform transcription
-                result = model.transcribe(audio_data, fp16=False)
+                metrics.inc("transcriber_transcriptions_total", input="Mic")
+                inference_start = time.perf_counter()  # monotonic, so clock changes can't skew the latency metrics
+                with metrics.profiled("transcribe_chunk"):
+                    result = model.transcribe(audio_data, fp16=False)
+                inference_time = time.perf_counter() - inference_start
                 text = result.get("text", "").strip()
                 print(f"[{time.strftime('%H:%M:%S')}] {text}")
 
@@ -77,8 +88,18 @@ def transcribe_audio():
                 with open(transcription_file, "a", encoding="utf-8") as f:
                     f.write(f"[{time.strftime('%H:%M:%S')}] {text}\n")
 
+                # Metrics go last and are guarded on their own, so they can never cost us the transcript
+                try:
+                    # Chunks that piled up while whisper was busy. If this keeps growing, transcription isn't keeping up
+                    metrics.set_gauge("transcriber_queue_depth", audio_queue.qsize(), input="Mic")
+                    metrics.record_transcription("Mic", inference_time, BUFFER_DURATION, len(result.get("segments", [])))
+                except Exception as e:
+                    print(f"Error recording metrics: {e}")
+
         except Exception as e:
             print(f"Error during transcription: {e}")
+            metrics.inc("transcriber_transcription_errors_total", input="Mic")
+            metrics.event("transcription_error", input="Mic", error=str(e))
 
     # Save audio to file
     print("Saving audio...")
@@ -93,6 +114,7 @@ def transcribe_audio():
 
 
 def main():
+    metrics.start_exporter()
     recording_thread = threading.Thread(target=record_audio, daemon=True)
     transcription_thread = threading.Thread(target=transcribe_audio, daemon=True)
 
@@ -110,6 +132,7 @@ def main():
     transcription_thread.join()
 
     print("Recording and transcription completed.")
+    metrics.stop_exporter()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,364 @@
+import os
+import sys
+import json
+import time
+import threading
+import cProfile
+import pstats
+from contextlib import contextmanager
+
+# Lightweight metrics for the capture -> buffer -> transcribe -> combine pipeline.
+# Everything lives in memory behind one lock and gets written out by a background thread,
+# so the audio callbacks only ever pay for a dict lookup and an add.
+
+# Output file names (relative to whatever folder start_exporter is given)
+metrics_file = "transcriber_metrics.prom"
+events_file = "transcriber_events.jsonl"
+profile_folder = "profiles"
+
+# Export settings
+export_interval = 5  # seconds between rewrites of the metrics file
+
+# Profiling settings. Off by default because cProfile is NOT low overhead
+profile_enabled = False
+profile_every = 10  # profile one in every N sections when enabled
+
+# Latency buckets in seconds. Covers a quick 5 second chunk on GPU up to a long file on CPU
+latency_buckets = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()  # separate so a slow disk never blocks the audio threads
+_counters = {}
+_gauges = {}
+_histograms = {}
+_help = {}
+_pending_events = []
+_profile_counts = {}
+_exporter_thread = None
+_exporter_stop = threading.Event()
+_output_folder = os.getcwd()
+_process_start = time.time()
+
+
+# Turn a labels dict into a hashable, stable key
+def _key(name, labels):
+    if not labels:
+        return name, ()
+    return name, tuple(sorted(labels.items()))
+
+
+def describe(name, text):
+    _help[name] = text
+
+
+# Counters only go up. Drops, frames, errors, that sort of thing
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+# Gauges are a current value, like queue depth or memory
+def set_gauge(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+
+# Histograms record a distribution. Stored as cumulative bucket counts plus sum and count
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = {"buckets": [0] * len(latency_buckets), "sum": 0.0, "count": 0}
+            _histograms[key] = hist
+        for i, bound in enumerate(latency_buckets):
+            if value <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+# True once start_exporter has been called. Events and file writes are skipped until then
+def is_running():
+    return _exporter_thread is not None
+
+
+# Queue an event for the JSONL log. Written out by the exporter, never on the caller's thread
+def event(kind, **fields):
+    if not is_running():
+        return  # nobody will ever write these out, so don't let them pile up
+    record = {"ts": round(time.time(), 3), "event": kind}
+    record.update(fields)
+    with _lock:
+        _pending_events.append(record)
+
+
+# Time a block and record it in a histogram. Also logs an event_kind event with the duration
+@contextmanager
+def timed(name, event_kind, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        observe(name, duration, **labels)
+        event(event_kind, duration=round(duration, 4), **labels)
+
+
+# Everything we record about one finished transcription. Real time factor is inference time over
+# audio length, so under 1 means faster than real time
+def record_transcription(input_name, inference_time, audio_duration, segments):
+    observe("transcriber_inference_seconds", inference_time, input=input_name)
+    inc("transcriber_segments_total", segments, input=input_name)
+    if audio_duration > 0:
+        set_gauge("transcriber_real_time_factor", round(inference_time / audio_duration, 4), input=input_name)
+    event("transcription", input=input_name, inference_seconds=round(inference_time, 3),
+          audio_seconds=round(audio_duration, 3), segments=segments)
+
+
+# Optionally run a block under cProfile. Only every Nth call per section gets profiled.
+# Needs the exporter running too, since that's what sets the folder the profiles go in
+@contextmanager
+def profiled(section):
+    if not profile_enabled or not is_running():
+        yield
+        return
+
+    with _lock:
+        count = _profile_counts.get(section, 0)
+        _profile_counts[section] = count + 1
+
+    if count % profile_every != 0:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        # A failed write here must never leak into the caller, or it would cost us the transcript
+        try:
+            folder = os.path.join(_output_folder, profile_folder)
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"{section}_{int(time.time())}_{count}.prof")
+            profiler.dump_stats(path)
+            event("profile_saved", section=section, path=path)
+        except Exception as e:
+            print(f"Error saving profile: {e}")
+
+
+# Print the top of a saved profile, for quick poking around without snakeviz
+def print_profile(path, limit=20):
+    pstats.Stats(path).sort_stats("cumulative").print_stats(limit)
+
+
+# Ask Windows for the working set directly, since there's no /proc or resource module there.
+# Returns (current, peak) in bytes
+def _windows_memory():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    get_current_process = ctypes.windll.kernel32.GetCurrentProcess
+    get_current_process.restype = wintypes.HANDLE
+    get_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+    get_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    get_memory_info.restype = wintypes.BOOL
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    if not get_memory_info(get_current_process(), ctypes.byref(counters), counters.cb):
+        return None, None
+    return counters.WorkingSetSize, counters.PeakWorkingSetSize
+
+
+# Current resident memory in bytes. psutil if we have it, then the windows API, then /proc on linux.
+# Mac without psutil has no cheap way to get this, so it returns None there
+def get_rss():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+
+    if os.name == "nt":
+        try:
+            return _windows_memory()[0]
+        except (OSError, AttributeError):
+            return None
+
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# Peak resident memory in bytes. Only ever goes up, so it's kept separate from the current value
+def get_peak_rss():
+    if os.name == "nt":
+        try:
+            return _windows_memory()[1]
+        except (OSError, AttributeError):
+            return None
+
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # mac reports bytes, linux reports KB
+    except ImportError:
+        return None
+
+
+# Prometheus wants backslashes, quotes and newlines escaped inside label values
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels)
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{_escape_label(v)}"' for k, v in items)
+    return "{" + body + "}"
+
+
+# Build the Prometheus text exposition format from a snapshot
+def render_prometheus():
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]} for k, v in _histograms.items()}
+
+    lines = []
+    seen = set()
+
+    def header(name, kind):
+        if name in seen:
+            return
+        seen.add(name)
+        if name in _help:
+            lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), value in sorted(gauges.items()):
+        header(name, "gauge")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), hist in sorted(histograms.items()):
+        header(name, "histogram")
+        for bound, count in zip(latency_buckets, hist["buckets"]):
+            lines.append(f"{name}_bucket{_format_labels(labels, ('le', bound))} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {hist['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+# Write everything out. Metrics file is replaced atomically so a scraper never sees half a file
+def flush():
+    if not is_running():
+        return
+
+    rss = get_rss()
+    if rss is not None:
+        set_gauge("transcriber_process_rss_bytes", rss)
+    peak_rss = get_peak_rss()
+    if peak_rss is not None:
+        set_gauge("transcriber_process_peak_rss_bytes", peak_rss)
+    set_gauge("transcriber_process_uptime_seconds", round(time.time() - _process_start, 3))
+
+    with _flush_lock:
+        _write_files()
+
+
+def _write_files():
+    try:
+        os.makedirs(_output_folder, exist_ok=True)
+        metrics_path = os.path.join(_output_folder, metrics_file)
+        tmp_path = metrics_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(render_prometheus())
+        os.replace(tmp_path, metrics_path)
+
+        with _lock:
+            events = _pending_events[:]
+            del _pending_events[:]
+        if events:
+            with open(os.path.join(_output_folder, events_file), "a", encoding="utf-8") as f:
+                for record in events:
+                    f.write(json.dumps(record) + "\n")
+    except Exception as e:
+        print(f"Error writing metrics: {e}")
+
+
+def _exporter_loop():
+    while not _exporter_stop.wait(export_interval):
+        flush()
+    flush()  # one last write so the final numbers make it out
+
+
+# Start the background writer. Safe to call again to point it at a new folder
+def start_exporter(folder=None):
+    global _exporter_thread, _output_folder
+    if folder:
+        _output_folder = folder
+    if _exporter_thread is not None and _exporter_thread.is_alive():
+        return
+    _exporter_stop.clear()
+    _exporter_thread = threading.Thread(target=_exporter_loop, daemon=True)
+    _exporter_thread.start()
+
+
+def stop_exporter():
+    global _exporter_thread
+    _exporter_stop.set()
+    if _exporter_thread is not None:
+        _exporter_thread.join()
+        _exporter_thread = None
+
+
+# Descriptions for the metrics the scripts use, shown as HELP lines
+describe("transcriber_audio_frames_total", "Audio frames captured per input")
+describe("transcriber_audio_chunks_total", "Audio chunks captured per input")
+describe("transcriber_audio_status_total", "Non-empty PortAudio status flags per input")
+describe("transcriber_audio_overflows_total", "Input overflows (dropped audio) per input")
+describe("transcriber_buffer_chunks", "Chunks currently held in the recording buffer")
+describe("transcriber_buffer_seconds", "Seconds of audio currently held in the recording buffer")
+describe("transcriber_queue_depth", "Chunks waiting in the audio queue")
+describe("transcriber_save_seconds", "Time to write a buffer to a wav file")
+describe("transcriber_inference_seconds", "Whisper inference time per chunk or file")
+describe("transcriber_real_time_factor", "Inference time divided by audio duration")
+describe("transcriber_transcriptions_total", "Transcriptions attempted")
+describe("transcriber_transcription_errors_total", "Transcriptions that raised an error")
+describe("transcriber_skipped_silence_total", "Chunks skipped because they were silent")
+describe("transcriber_segments_total", "Segments produced by Whisper")
+describe("transcriber_merge_seconds", "Time to combine the per-input transcriptions")
+describe("transcriber_merged_lines_total", "Lines written to the combined transcription")
+describe("transcriber_process_rss_bytes", "Resident memory of the process")
+describe("transcriber_process_peak_rss_bytes", "Peak resident memory of the process")
+describe("transcriber_process_uptime_seconds", "Seconds since the process started")
@@ -0,0 +1,166 @@
+import json
+import os
+
+import pytest
+
+import metrics
+
+
+# Clear out the module state between tests and park the exporter on a temp folder.
+# The interval is long so only the flushes we call ourselves ever run
+@pytest.fixture
+def exporter(tmp_path, monkeypatch):
+    for store in (metrics._counters, metrics._gauges, metrics._histograms, metrics._profile_counts):
+        store.clear()
+    del metrics._pending_events[:]
+    monkeypatch.setattr(metrics, "export_interval", 3600)
+    metrics.start_exporter(str(tmp_path))
+    yield tmp_path
+    metrics.stop_exporter()
+
+
+def read_events(folder):
+    with open(os.path.join(folder, metrics.events_file), "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_observe_fills_buckets_cumulatively(exporter):
+    metrics.observe("latency", 0.07)
+    metrics.observe("latency", 3)
+    metrics.observe("latency", 1000)
+
+    buckets = metrics._histograms[("latency", ())]["buckets"]
+    expected = [sum(1 for v in (0.07, 3, 1000) if v <= bound) for bound in metrics.latency_buckets]
+    assert buckets == expected
+    assert buckets == sorted(buckets)  # cumulative, so never goes down
+
+
+def test_render_histogram_inf_matches_count(exporter):
+    for value in (0.01, 0.3, 7, 900):
+        metrics.observe("latency", value, input="Mic")
+
+    text = metrics.render_prometheus()
+    assert "# TYPE latency histogram" in text
+    assert 'latency_bucket{input="Mic",le="0.05"} 1' in text
+    assert 'latency_bucket{input="Mic",le="10"} 3' in text
+    assert 'latency_bucket{input="Mic",le="+Inf"} 4' in text
+    assert 'latency_count{input="Mic"} 4' in text
+
+
+def test_render_counters_and_gauges(exporter):
+    metrics.inc("frames_total", 1024, input="Mic")
+    metrics.inc("frames_total", 1024, input="Mic")
+    metrics.set_gauge("depth", 3)
+    metrics.set_gauge("depth", 5)
+
+    text = metrics.render_prometheus()
+    assert "# TYPE frames_total counter" in text
+    assert 'frames_total{input="Mic"} 2048' in text
+    assert "# TYPE depth gauge" in text
+    assert "depth 5" in text
+
+
+def test_render_escapes_label_values(exporter):
+    metrics.inc("errors_total", input='C:\\rec "one"\nnext')
+
+    text = metrics.render_prometheus()
+    assert 'errors_total{input="C:\\\\rec \\"one\\"\\nnext"} 1' in text
+
+
+def test_flush_writes_metrics_file(exporter):
+    metrics.inc("frames_total", 10)
+    metrics.flush()
+
+    with open(os.path.join(exporter, metrics.metrics_file), "r", encoding="utf-8") as f:
+        text = f.read()
+    assert "frames_total 10" in text
+    assert "transcriber_process_uptime_seconds" in text
+    assert not os.path.exists(os.path.join(exporter, metrics.metrics_file + ".tmp"))
+
+
+def test_flush_writes_each_event_once(exporter):
+    metrics.event("first", input="Mic")
+    metrics.event("second", segments=3)
+    metrics.flush()
+    metrics.event("third")
+    metrics.flush()
+    metrics.flush()
+
+    events = read_events(exporter)
+    assert [e["event"] for e in events] == ["first", "second", "third"]
+    assert events[0]["input"] == "Mic"
+    assert events[1]["segments"] == 3
+
+
+def test_disabled_metrics_write_nothing(exporter):
+    metrics.stop_exporter()  # does its own last flush, so clear that out first
+    os.remove(os.path.join(exporter, metrics.metrics_file))
+
+    metrics.event("ignored")
+    metrics.flush()
+
+    assert metrics._pending_events == []
+    assert not os.path.exists(os.path.join(exporter, metrics.metrics_file))
+
+
+def test_profiled_respects_profile_every(exporter, monkeypatch):
+    monkeypatch.setattr(metrics, "profile_enabled", True)
+    monkeypatch.setattr(metrics, "profile_every", 3)
+
+    for _ in range(7):
+        with metrics.profiled("section"):
+            sum(range(100))
+
+    saved = os.listdir(os.path.join(exporter, metrics.profile_folder))
+    assert len(saved) == 3  # calls 0, 3 and 6
+
+
+def test_profiled_survives_unwritable_folder(exporter, monkeypatch):
+    monkeypatch.setattr(metrics, "profile_enabled", True)
+    blocker = exporter / "not_a_folder"
+    blocker.write_text("")
+    monkeypatch.setattr(metrics, "_output_folder", str(blocker))  # makedirs fails under a file
+
+    ran = False
+    with metrics.profiled("section"):
+        ran = True
+
+    assert ran
+    assert metrics._pending_events == []  # no profile_saved event for a profile that wasn't saved
+
+
+def test_profiled_off_by_default(exporter):
+    with metrics.profiled("section"):
+        pass
+
+    assert not os.path.exists(os.path.join(exporter, metrics.profile_folder))
+
+
+def test_profiled_needs_exporter(exporter, monkeypatch):
+    monkeypatch.setattr(metrics, "profile_enabled", True)
+    metrics.stop_exporter()
+
+    with metrics.profiled("section"):
+        pass
+
+    assert not os.path.exists(os.path.join(exporter, metrics.profile_folder))
+    assert metrics._profile_counts == {}
+
+
+def test_timed_records_histogram_and_event(exporter):
+    with metrics.timed("save_seconds", "audio_saved"):
+        pass
+    metrics.flush()
+
+    assert metrics._histograms[("save_seconds", ())]["count"] == 1
+    events = read_events(exporter)
+    assert [e["event"] for e in events] == ["audio_saved"]
+    assert "duration" in events[0]
+
+
+def test_record_transcription(exporter):
+    metrics.record_transcription("Mic", 2.5, 10, 4)
+
+    assert metrics._histograms[("transcriber_inference_seconds", (("input", "Mic"),))]["count"] == 1
+    assert metrics._counters[("transcriber_segments_total", (("input", "Mic"),))] == 4
+    assert metrics._gauges[("transcriber_real_time_factor", (("input", "Mic"),))] == 0.25
@@ -4,6 +4,7 @@ import wave
 import time
 import whisper
 import threading
+import metrics
 
 # Device indices
 mic_index = 2
@@ -32,34 +33,46 @@ stop_event = threading.Event()
 model = whisper.load_model("base", device="cuda")
 
 
-def audio_callback(indata, frames, time, status, buffer):
+def audio_callback(indata, frames, time, status, buffer, device_name):
     if status:
         print(f"Audio status: {status}")
+        metrics.inc("transcriber_audio_status_total", input=device_name)
+        if status.input_overflow:
+            metrics.inc("transcriber_audio_overflows_total", input=device_name)
     buffer.append(indata.copy())
+    metrics.inc("transcriber_audio_chunks_total", input=device_name)
+    metrics.inc("transcriber_audio_frames_total", frames, input=device_name)
 
 
 def record_audio(device_index, buffer, device_name):
     print(f"Recording started on {device_name}.")
+    metrics.event("recording_started", input=device_name, device=device_index)
     with sd.InputStream(
         samplerate=samplerate,
         channels=channels,
-        callback=lambda indata, frames, time, status: audio_callback(indata, frames, time, status, buffer),
+        callback=lambda indata, frames, time, status: audio_callback(indata, frames, time, status, buffer, device_name),
         device=device_index,
         dtype="float32",
     ):
         while not stop_event.is_set():
             time.sleep(0.1)  # Keep the script alive
 
+            # Buffer size is checked here rather than in the callback to keep the callback cheap
+            metrics.set_gauge("transcriber_buffer_chunks", len(buffer), input=device_name)
+            if buffer:
+                metrics.set_gauge("transcriber_buffer_seconds", round(len(buffer) * len(buffer[0]) / samplerate, 2), input=device_name)  # blocks are all about the same size
+
 
 def save_audio(buffer, filename):
     if buffer:
         print(f"Saving audio to {filename}...")
-        with wave.open(filename, "wb") as wf:
+        with metrics.timed("transcriber_save_seconds", "audio_saved"):
+            with wave.open(filename, "wb") as wf:
 
-            wf.setnchannels(channels)
-            wf.setsampwidth(2) # This sets it to 16 bit (2 byte = 16 bit)
-            wf.setframerate(samplerate)
-            wf.writeframes((np.concatenate(buffer) * 32767).astype(np.int16).tobytes()) # scaling to 16 bit
+                wf.setnchannels(channels)
+                wf.setsampwidth(2) # This sets it to 16 bit (2 byte = 16 bit)
+                wf.setframerate(samplerate)
+                wf.writeframes((np.concatenate(buffer) * 32767).astype(np.int16).tobytes()) # scaling to 16 bit
 
         print(f"Audio saved to {filename}.")
     else:
@@ -70,7 +83,11 @@ def transcribe_audio(file, device_name, output_file):
     try:
         print(f"Transcribing {file} from {device_name}...")
         start_time = time.time()
-        result = model.transcribe(file, fp16=False)
+        metrics.inc("transcriber_transcriptions_total", input=device_name)
+        inference_start = time.perf_counter()  # monotonic, so clock changes can't skew the latency metrics
+        with metrics.profiled("transcribe"):
+            result = model.transcribe(file, fp16=False)
+        inference_time = time.perf_counter() - inference_start
 
         with open(output_file, "w", encoding="utf-8") as f:
             for segment in result["segments"]:
@@ -80,12 +97,23 @@ def transcribe_audio(file, device_name, output_file):
 
         duration = time.time() - start_time
         print(f"Transcription for {device_name} completed in {duration:.2f} seconds.")
+
+        # Metrics go last and are guarded on their own, so they can never cost us the transcript
+        try:
+            with wave.open(file, "rb") as wf:
+                audio_duration = wf.getnframes() / wf.getframerate()
+            metrics.record_transcription(device_name, inference_time, audio_duration, len(result["segments"]))
+        except Exception as e:
+            print(f"Error recording metrics for {device_name}: {e}")
     except Exception as e:
         print(f"Error during transcription for {device_name}: {e}")
+        metrics.inc("transcriber_transcription_errors_total", input=device_name)
+        metrics.event("transcription_error", input=device_name, error=str(e))
 
 
 def combine_transcriptions(mic_file, device_file, combined_file):
     print("Combining transcriptions...")
+    merge_start = time.perf_counter()
     try:
         mic_lines = []
         device_lines = []
@@ -111,6 +139,8 @@ def combine_transcriptions(mic_file, device_file, combined_file):
             for entry in combined_lines:
                 combined_file.write(f"{entry['source']}: {entry['line']}\n")
 
+        metrics.observe("transcriber_merge_seconds", time.perf_counter() - merge_start)
+        metrics.inc("transcriber_merged_lines_total", len(combined_lines))
         print("Combined transcription saved.")
     except Exception as e:
         print(f"Error during transcript combination: {e}")
@@ -118,6 +148,7 @@ def combine_transcriptions(mic_file, device_file, combined_file):
 
 def main():
     print("Initializing...")
+    metrics.start_exporter()
     recording_start_time = time.time()
 
     # Recording threads
@@ -157,6 +188,7 @@ def main():
     transcription_duration = time.time() - transcription_start_time
     print(f"Transcription completed in {transcription_duration:.2f} seconds.")
     print("Recording and transcription process completed.")
+    metrics.stop_exporter()
 
 
 if __name__ == "__main__":